@@ -3,11 +3,196 @@
 
 
 import argparse
+import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
 import json
 import re
 import fitz 
 from datetime import datetime
-import pandas as pd
+from operator import itemgetter
+
+from parser_core import assemble_sections, clean_text
+
+try:
+    # orjson writes indented JSON far faster than the stdlib encoder; fall back to json if absent
+    import orjson
+except ImportError:
+    orjson = None
+
+# Regexes to match common date formats; the literal-anchored ISO scan is tried first
+_ISO_DATE_RE = re.compile(r'\b(?:\d{4}-\d{2}-\d{2}|\d{4}\.\d{2}\.\d{2})\b')
+_MONTH_DATE_RE = re.compile(
+    r'(?i)\b(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\s+\d{1,2},\s+\d{4}\b'
+)
+
+# strptime formats keyed on the ISO separator or the month-name style
+_DATE_FORMATS = {
+    "-": '%Y-%m-%d',
+    ".": '%Y.%m.%d',
+    "abbr": '%b %d, %Y',
+    "full": '%B %d, %Y',
+}
+
+# Title keywords and the contract type they indicate, checked in order
+_CONTRACT_TYPES = (
+    ("OPEN SOURCE", "Open Source Agreement"),
+    ("LICENSE", "License Agreement"),
+    ("NON-DISCLOSURE", "Non-Disclosure Agreement"),
+    ("SERVICE", "Service Agreement"),
+    ("EMPLOYMENT", "Employment Contract"),
+    ("SALES", "Sales Agreement"),
+    ("LEASE", "Lease Agreement"),
+    ("CONSULTING", "Consulting Agreement"),
+    ("CONSTRUCTION", "Construction Contract"),
+)
+
+# get_text("dict") defaults without TEXT_PRESERVE_IMAGES: image blocks carry no text
+_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Documents with at least this many pages are extracted in a process pool
+_PARALLEL_MIN_PAGES = 16
+
+# Height of the band at the bottom of each page treated as the footer
+_FOOTER_HEIGHT = 100
+
+def _is_block_in_table(block_bbox, table_rects, table_tops):
+    """
+    Checks if a given text block's bounding box intersects with any table
+    bounding box on the same page.
+
+    Args:
+        block_bbox (tuple): The bounding box of the text block.
+        table_rects (list): The page's non-empty `(x0, y0, x1, y1)` table
+            bounding boxes, sorted by top edge.
+        table_tops (list): The top edges of `table_rects`.
+    """
+    bx0, by0, bx1, by1 = block_bbox
+    # An empty block never intersects, matching `fitz.Rect.intersects`
+    if bx0 >= bx1 or by0 >= by1:
+        return False
+    # Only tables whose top edge is above the block's bottom edge can overlap it
+    end = bisect_right(table_tops, by1)
+    for tx0, ty0, tx1, ty1 in table_rects[:end]:
+        if bx0 < tx1 and tx0 < bx1 and by0 < ty1 and ty0 < by1:
+            return True
+    return False
+
+def _table_to_json(table):
+    """
+    Converts a table into the same split layout as pandas'
+    `to_json(orient="split")`, built directly from the extracted rows.
+
+    Args:
+        table (fitz.table.Table): The table to convert.
+
+    Returns:
+        dict: The table's column names, row index and cell data.
+    """
+    rows = table.extract()
+    # Column names are made unique the same way `Table.to_pandas()` does it
+    names = [name or f"Col{i}" for i, name in enumerate(table.header.names)]
+    if len(names) != len(set(names)):
+        names = [name if name == f"Col{i}" else f"{i}-{name}" for i, name in enumerate(names)]
+    if not table.header.external:  # header is part of the extracted rows
+        rows = rows[1:]
+    return {
+        "columns": names,
+        "index": list(range(len(rows))),
+        "data": [row[:len(names)] for row in rows],
+    }
+
+def _extract_page(page):
+    """
+    Extracts the footer text and the reading-ordered tables and text blocks of
+    a single page. Items are plain, picklable dicts so pages can be extracted
+    in worker processes.
+
+    Args:
+        page (fitz.Page): The page to extract.
+
+    Returns:
+        tuple: The raw footer text and the list of page items.
+    """
+    page_items = []
+    add_item = page_items.append
+    table_rects = []
+    
+    # Extract tables and their bounding boxes; table detection works off vector
+    # graphics, so pages without any drawings are skipped cheaply
+    page_tables = page.find_tables() if page.get_cdrawings() else None
+    if page_tables and page_tables.tables:
+        table_rects = sorted(
+            (tuple(table.bbox) for table in page_tables.tables if table.bbox[0] < table.bbox[2] and table.bbox[1] < table.bbox[3]),
+            key=itemgetter(1),
+        )
+        for table in page_tables.tables:
+            add_item({"type": "table", "table_data": _table_to_json(table), "top": table.bbox[1]})
+    table_tops = [r[1] for r in table_rects]
+    
+    # Define footer area
+    page_height = page.rect.height
+    footer_y = page_height - _FOOTER_HEIGHT
+    
+    # Extract text blocks once; the footer is collected from the same dict in the same pass
+    page_text_blocks = page.get_text("dict", flags=_TEXT_FLAGS)['blocks']
+    footer_texts = []
+    for block in page_text_blocks:
+        bbox = block['bbox']
+        lines = block['lines']
+        if bbox[3] > footer_y:
+            # Keep the text of the lines that reach into the footer
+            footer_texts.append("".join([span['text'] for line in lines if line['bbox'][3] > footer_y for span in line['spans']]))
+        
+        first_span = lines[0]['spans'][0] if lines and lines[0]['spans'] else None
+        # Blocks in the footer or in a table are kept only so the reading order is preserved
+        if first_span is None or bbox[1] > footer_y or table_rects and _is_block_in_table(bbox, table_rects, table_tops):
+            add_item({"type": "text", "top": bbox[1], "excluded": True})
+            continue
+        
+        span_texts = [span['text'] for line in lines for span in line['spans']]
+        add_item({
+            "type": "text",
+            "top": bbox[1],
+            "excluded": False,
+            "text": "".join(span_texts),
+            "first_span_text": first_span['text'],
+            "first_line_rest": "".join(span_texts[1:len(lines[0]['spans'])]),
+            "is_bold": bool(first_span['flags'] & 16),
+            "has_capital": any(c.isupper() for c in first_span['text']),
+        })
+    
+    # Sort items by their vertical position to ensure reading order
+    page_items.sort(key=itemgetter("top"))
+    footer_text = " ".join(footer_texts)
+    
+    return footer_text, page_items
+
+# The document each pool worker opens once in `_init_worker`
+_worker_doc = None
+
+def _init_worker(pdf_bytes):
+    """
+    Opens the document from the in-memory PDF once per process-pool worker,
+    since a `fitz.Document` cannot be shared across processes.
+
+    Args:
+        pdf_bytes (bytes): The contents of the input PDF.
+    """
+    global _worker_doc
+    _worker_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+
+def _parse_pages(page_numbers):
+    """
+    Extracts a range of pages from the worker's document.
+
+    Args:
+        page_numbers (range): The pages to extract.
+
+    Returns:
+        list: The `_extract_page` result of each page, in order.
+    """
+    return [_extract_page(_worker_doc[number]) for number in page_numbers]
 
 class PDFContractParser:
     """
@@ -32,7 +217,6 @@ class PDFContractParser:
             "preamble": "",
             "sections": []
         }
-        self.table_bboxes = {}  # Dictionary to store table bounding boxes by page number
 
     def _clean_text(self, text):
         """
@@ -45,27 +229,26 @@ class PDFContractParser:
         Returns:
             str: The cleaned text.
         """
-        # Replace common smart quotes with standard quotes
-        text = text.replace('\u201c', '"').replace('\u201d', '"').replace('“', '"').replace('”', '"').replace('\\"', '"').replace("\"", "")
-        # Normalize all whitespace to a single space
-        return re.sub(r'\s+', ' ', text).strip()
+        return clean_text(text)
 
-    def _extract_header_metadata(self):
+    def _extract_header_metadata(self, first_page_dict, page_height):
         """
         Extracts the title and contract type from the document's first page.
+
+        Args:
+            first_page_dict (dict): The `get_text("dict")` output of the first page.
+            page_height (float): The height of the first page's (rotated) rect.
         """
         try:
-            first_page = self.doc[0]
-            page_width = first_page.rect.width
-            page_height = first_page.rect.height
-            # Define a clip area for the top quarter of the page
-            title_area = fitz.Rect(0, 0, page_width, page_height / 4)
-            full_text_dict = first_page.get_text("dict", clip=title_area)
+            # Only lines starting in the top quarter of the page are considered
+            title_area_bottom = page_height / 4
             
-            if full_text_dict['blocks']:
-                for block in full_text_dict['blocks']:
+            if first_page_dict['blocks']:
+                for block in first_page_dict['blocks']:
                     if 'lines' in block:
                         for line in block['lines']:
+                            if line['bbox'][1] >= title_area_bottom:
+                                continue
                             line_text = self._clean_text("".join([span['text'] for span in line['spans']]))
                             if line_text:
                                 self.metadata["title"] = line_text
@@ -75,59 +258,48 @@ class PDFContractParser:
             
             if self.metadata["title"]:
                 title_upper = self.metadata["title"].upper()
-                if "OPEN SOURCE" in title_upper:
-                    self.metadata["contract_type"] = "Open Source Agreement"
-                elif "LICENSE" in title_upper:
-                    self.metadata["contract_type"] = "License Agreement"
-                elif "NON-DISCLOSURE" in title_upper:
-                    self.metadata["contract_type"] = "Non-Disclosure Agreement"
-                elif "SERVICE" in title_upper:
-                    self.metadata["contract_type"] = "Service Agreement"
-                elif "EMPLOYMENT" in title_upper:
-                    self.metadata["contract_type"] = "Employment Contract"
-                elif "SALES" in title_upper:
-                    self.metadata["contract_type"] = "Sales Agreement"
-                elif "LEASE" in title_upper:
-                    self.metadata["contract_type"] = "Lease Agreement"
-                elif "CONSULTING" in title_upper:
-                    self.metadata["contract_type"] = "Consulting Agreement"
-                elif "CONSTRUCTION" in title_upper:
-                    self.metadata["contract_type"] = "Construction Contract"
+                for needle, contract_type in _CONTRACT_TYPES:
+                    if needle in title_upper:
+                        self.metadata["contract_type"] = contract_type
+                        break
         
         except Exception as e:
             print(f"Error extracting header metadata: {e}")
 
-    def _extract_effective_date(self):
+    def _extract_effective_date(self, first_page_dict):
         """
         Extracts the effective date from the first page of the document.
+
+        Args:
+            first_page_dict (dict): The `get_text("dict")` output of the first page.
         """
         try:
-            first_page = self.doc[0]
-            full_text = self._clean_text(first_page.get_text())
+            # Lines are separated by a space, as the newlines of plain-text extraction would be after cleaning
+            full_text = self._clean_text(" ".join(
+                "".join([span['text'] for span in line['spans']])
+                for block in first_page_dict['blocks'] for line in block.get('lines', ())
+            ))
+            
+            iso_match = _ISO_DATE_RE.search(full_text)
+            # Only scan for a written-out date ahead of the ISO one so the earliest date wins
+            end = iso_match.start() if iso_match else len(full_text)
+            month_match = _MONTH_DATE_RE.search(full_text, 0, end)
             
-            # Regex to match common date formats
-            date_pattern = re.compile(
-                r'\b(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\s+\d{1,2},\s+\d{4}\b|\b\d{4}-\d{2}-\d{2}\b|\b\d{4}\.\d{2}\.\d{2}\b',
-                re.IGNORECASE
-            )
-            date_match = date_pattern.search(full_text)
+            if month_match:
+                date_str = month_match.group(0)
+                fmt = _DATE_FORMATS["abbr" if len(date_str.split(None, 1)[0]) == 3 else "full"]
+            elif iso_match:
+                date_str = iso_match.group(0)
+                fmt = _DATE_FORMATS[date_str[4]]
+            else:
+                date_str = None
             
-            if date_match:
-                date_str = date_match.group(0)
+            if date_str:
                 date_obj = None
                 try:
-                    date_obj = datetime.strptime(date_str, '%B %d, %Y')
+                    date_obj = datetime.strptime(date_str, fmt)
                 except ValueError:
-                    try:
-                        date_obj = datetime.strptime(date_str, '%b %d, %Y')
-                    except ValueError:
-                        try:
-                            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-                        except ValueError:
-                            try:
-                                date_obj = datetime.strptime(date_str, '%Y.%m.%d')
-                            except ValueError:
-                                pass
+                    pass
                 
                 if date_obj:
                     self.metadata["effective_date"] = date_obj.strftime('%Y-%m-%d')
@@ -135,195 +307,29 @@ class PDFContractParser:
         except Exception as e:
             print(f"Error extracting effective date: {e}")
 
-    def _is_block_in_table(self, block_bbox, page_number):
-        """
-        Checks if a given text block's bounding box intersects with any table
-        bounding box on the same page.
-        """
-        if page_number in self.table_bboxes:
-            block_rect = fitz.Rect(block_bbox)
-            for table_rect in self.table_bboxes[page_number]:
-                if block_rect.intersects(table_rect):
-                    return True
-        return False
-        
-    def _extract_content(self):
+    def _extract_content(self, pdf_bytes):
         """
         Extracts all sections and clauses from the entire document, skipping
         any text that falls within a table's bounding box. Tables are nested inside clauses.
-        """
-        preamble_text = ""
-        current_section = None
-        is_in_section = False
-        footer_text_seen = set()
-        
-        # Regex patterns for various formats
-        #section_re = re.compile(r'^\s*(\d+\.?)\s*(.+)?$')
-        section_re = re.compile(r'^\s*([IVXLCDM]+\s*|(?:\d+(?:\.\d+)*)\.?)\s*(.+)?$', re.IGNORECASE)
-        clause_re = re.compile(r'^\s*([a-zA-Z]\.|\d+\.\d+\.?|\(\w+\))\s*(.+)?$')
-        divider_re = re.compile(r'^\s*_{2,}\s*(.+)?$')
-        
-        # Flag to skip the very first block, assumed to be the title
-        skip_first_block = True
 
-        for page in self.doc:
-            page_items = []
-            
-            # Extract tables and their bounding boxes
-            page_tables = page.find_tables()
-            if page_tables.tables:
-                self.table_bboxes[page.number] = [fitz.Rect(table.bbox) for table in page_tables.tables]
-                for table in page_tables.tables:
-                    page_items.append({"type": "table", "content": table, "bbox": table.bbox})
-            
-            # Extract text blocks
-            page_text_blocks = page.get_text("dict")['blocks']
-            for block in page_text_blocks:
-                page_items.append({"type": "text", "content": block, "bbox": block['bbox']})
-            
-            # Sort items by their vertical position to ensure reading order
-            page_items.sort(key=lambda item: item['bbox'][1])
-            
-            # Define footer area and extract its text
-            footer_height = 100
-            page_height = page.rect.height
-            footer_blocks = page.get_text("dict", clip=fitz.Rect(0, page_height - footer_height, page.rect.width, page_height))['blocks']
-            footer_text = " ".join("".join(span['text'] for line in block['lines'] for span in line['spans']) for block in footer_blocks)
-            cleaned_footer_text = self._clean_text(footer_text)
-            
-            if cleaned_footer_text and cleaned_footer_text not in footer_text_seen:
-                preamble_text += " " + cleaned_footer_text
-                footer_text_seen.add(cleaned_footer_text)
-            
-            for item in page_items:
-                if skip_first_block:
-                    skip_first_block = False
-                    continue
-
-                if item["type"] == "table":
-                    if not current_section:
-                        # Create a placeholder section for tables if none exists
-                        current_section = {
-                            "number": None,
-                            "title": None,
-                            "clauses": []
-                        }
-                        is_in_section = True
-                        
-                    df = item["content"].to_pandas()
-                    if df is not None:
-                        table_json = json.loads(df.to_json(orient="split"))
-                        current_section["clauses"].append({
-                            "text": None,
-                            "label": None,
-                            "index": len(current_section["clauses"]),
-                            "table_data": table_json
-                        })
-                    continue  # Skip to the next item
-
-                # Process text blocks, skipping if in footer or in a table
-                block = item["content"]
-                if block.get('bbox')[1] > page_height - footer_height or self._is_block_in_table(block.get('bbox'), page.number):
-                    continue
-                
-                block_text = "".join([span['text'] for line in block['lines'] for span in line['spans']])
-                
-                if 'lines' not in block or not block['lines']:
-                    continue
+        Args:
+            pdf_bytes (bytes): The contents of the input PDF, handed to the pool workers.
+        """
+        # CPUs this process may run on; the affinity mask respects container and taskset limits
+        cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+        workers = min(cpus, self.doc.page_count)
+        if self.doc.page_count >= _PARALLEL_MIN_PAGES and workers > 1:
+            # Pages are independent, so contiguous page ranges are extracted in worker processes
+            chunk_size = -(-self.doc.page_count // workers)
+            chunks = [range(start, min(start + chunk_size, self.doc.page_count))
+                      for start in range(0, self.doc.page_count, chunk_size)]
+            # The PDF bytes are handed to each worker once, not re-read from disk per worker
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pdf_bytes,)) as executor:
+                pages = [page for chunk in executor.map(_parse_pages, chunks) for page in chunk]
+        else:
+            pages = [_extract_page(page) for page in self.doc]
 
-                first_line = block['lines'][0]
-                first_span = first_line['spans'][0]
-                
-                is_bold = bool(first_span['flags'] & 16)
-                has_capital = any(c.isupper() for c in first_span['text'])
-                
-                section_match = section_re.match(block_text)
-                clause_match = clause_re.match(block_text)
-                divider_match = divider_re.match(block_text)
-                
-                # --- State Machine Logic ---
-                if section_match:
-                    if current_section:
-                        self.metadata["sections"].append(current_section)
-                    
-                    is_in_section = True
-                    number = section_match.group(1).strip()
-                    title = self._clean_text(section_match.group(2))
-                    
-                    current_section = {
-                        "number": number,
-                        "title": title,
-                        "clauses": []
-                    }
-                
-                elif not is_in_section and clause_match:
-                    if current_section:
-                         self.metadata["sections"].append(current_section)
-
-                    is_in_section = True
-                    label = self._clean_text(clause_match.group(1))
-                    title = self._clean_text(clause_match.group(2)) if clause_match.group(2) else ""
-
-                    current_section = {
-                        "number": label,
-                        "title": title,
-                        "clauses": []
-                    }
-                
-                elif divider_match:
-                    if current_section:
-                        self.metadata["sections"].append(current_section)
-                    
-                    is_in_section = True
-                    title = self._clean_text(divider_match.group(1))
-                    
-                    current_section = {
-                        "number": "",
-                        "title": title,
-                        "clauses": []
-                    }
-                    
-                elif is_in_section and current_section and (clause_match or (is_bold and has_capital)):
-                    if clause_match:
-                        label = self._clean_text(clause_match.group(1))
-                        clause_text = self._clean_text(clause_match.group(2)) if clause_match.group(2) else ""
-                    else:
-                        label = self._clean_text(first_span['text'])
-                        label = re.sub(r'^["“”]+|["“”]+$', '', label)
-                        remaining_text = "".join([span['text'] for span in first_line['spans'][1:]])
-                        clause_text = self._clean_text(remaining_text)
-
-                    if current_section:
-                        current_section["clauses"].append({
-                            "text": clause_text,
-                            "label": label,
-                            "index": len(current_section["clauses"])
-                        })
-                    
-                elif not is_in_section:
-                    preamble_text += " " + self._clean_text(block_text)
-                
-                elif is_in_section and current_section:
-                    if not current_section["clauses"]:
-                        # This is the start of the first clause, immediately following the section title
-                        current_section["clauses"].append({
-                            "text": self._clean_text(block_text),
-                            "label": "",
-                            "index": 0
-                        })
-                    elif "table_data" in current_section["clauses"][-1]:
-                        # Do nothing if the last item was a table
-                        continue
-                    else:
-                        # Append to the last clause
-                        last_clause = current_section["clauses"][-1]
-                        last_clause["text"] += " " + self._clean_text(block_text)
-
-
-        if current_section:
-            self.metadata["sections"].append(current_section)
-
-        self.metadata["preamble"] = self._clean_text(preamble_text)
+        self.metadata["sections"], self.metadata["preamble"] = assemble_sections(pages)
     
     def parse_document(self):
         """
@@ -333,11 +339,19 @@ class PDFContractParser:
             dict: The complete structured data of the document.
         """
         try:
-            self.doc = fitz.open(self.pdf_path)
+            # Read the file once; the same buffer backs the document and the pool workers
+            with open(self.pdf_path, 'rb') as f:
+                pdf_bytes = f.read()
+            self.doc = fitz.open(stream=pdf_bytes, filetype="pdf")
             
-            self._extract_header_metadata()
-            self._extract_effective_date()
-            self._extract_content()
+            # The first page is extracted once and shared by the title and date lookups;
+            # a document without pages keeps the default metadata
+            if self.doc.page_count:
+                first_page = self.doc[0]
+                first_page_dict = first_page.get_text("dict", flags=_TEXT_FLAGS)
+                self._extract_header_metadata(first_page_dict, first_page.rect.height)
+                self._extract_effective_date(first_page_dict)
+            self._extract_content(pdf_bytes)
             
             return self.metadata
             
@@ -363,8 +377,12 @@ def main():
     
     if final_output:
         try:
-            with open(args.output_json, 'w', encoding='utf-8') as f:
-                json.dump(final_output, f, indent=2, ensure_ascii=False)
+            if orjson:
+                with open(args.output_json, 'wb') as f:
+                    f.write(orjson.dumps(final_output, option=orjson.OPT_INDENT_2))
+            else:
+                with open(args.output_json, 'w', encoding='utf-8') as f:
+                    json.dump(final_output, f, indent=2, ensure_ascii=False)
             
             print(f"Successfully parsed the document and saved to '{args.output_json}'.")
         except Exception as e:
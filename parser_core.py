@@ -0,0 +1,209 @@
+"""
+The block-level section and clause state machine of the contract parser.
+
+This module is pure Python with no PyMuPDF dependency so it can optionally be
+compiled with mypyc (`mypyc parser_core.py`); when the compiled extension sits
+next to this file Python imports it in preference to the source.
+"""
+
+import re
+from typing import Any
+
+# Section, clause and divider labels in one pattern; alternatives are tried in that order
+_LABEL_RE = re.compile(
+    r'^\s*(?:'
+    r'(?P<sec>(?i:[IVXLCDM]+)\s*|(?:\d+(?:\.\d+)*)\.?)\s*(?P<sec_title>.+)?'
+    r'|(?P<cl>[a-zA-Z]\.|\d+\.\d+\.?|\(\w+\))\s*(?P<cl_title>.+)?'
+    r'|_{2,}\s*(?P<div>.+)?'
+    r')$'
+)
+
+# Characters a label can start with, checked before running the regex above; Unicode
+# digits are caught by str.isdecimal() and letter clause labels by their trailing '.'.
+# The dotted and dotless i match [IVXLCDM] case-insensitively in re.
+_LABEL_START = frozenset("IVXLCDMivxlcdm\u0130\u0131(_")
+
+_WS_RE = re.compile(r'\s+')
+_QUOTE_STRIP_RE = re.compile(r'^["“”]+|["“”]+$')
+_ESCAPED_QUOTE_RE = re.compile(r'\\["“”]')
+
+# Drops straight and smart double quotes in a single C-level pass
+_QUOTE_TABLE = str.maketrans({'\u201c': None, '\u201d': None, '"': None})
+
+
+def clean_text(text: str) -> str:
+    """
+    Normalizes whitespace, removes leading/trailing spaces, and handles
+    specific Unicode characters.
+
+    Args:
+        text (str): The text to clean.
+
+    Returns:
+        str: The cleaned text.
+    """
+    # Escaped quotes are dropped together with their backslash
+    if '\\' in text:
+        text = _ESCAPED_QUOTE_RE.sub('', text)
+    # Strip straight and smart quotes, then normalize all whitespace to a single space
+    return _WS_RE.sub(' ', text.translate(_QUOTE_TABLE)).strip()
+
+
+def assemble_sections(pages: list[tuple[str, list[dict[str, Any]]]]) -> tuple[list[dict[str, Any]], str]:
+    """
+    Runs the section/clause state machine over the extracted pages in document
+    order. Tables are nested inside clauses.
+
+    Args:
+        pages (list): The `(footer_text, page_items)` pair of each page.
+
+    Returns:
+        tuple: The list of sections and the preamble text.
+    """
+    sections: list[dict[str, Any]] = []
+    preamble_parts: list[str] = []
+    current_section: dict[str, Any] | None = None
+    is_in_section = False
+    footer_text_seen: set[str] = set()
+    
+    # Flag to skip the very first block, assumed to be the title
+    skip_first_block = True
+
+    for footer_text, page_items in pages:
+        cleaned_footer_text = clean_text(footer_text)
+
+        if cleaned_footer_text and cleaned_footer_text not in footer_text_seen:
+            preamble_parts.append(cleaned_footer_text)
+            footer_text_seen.add(cleaned_footer_text)
+
+        for item in page_items:
+            if skip_first_block:
+                skip_first_block = False
+                continue
+
+            if item["type"] == "table":
+                if not current_section:
+                    # Create a placeholder section for tables if none exists
+                    current_section = {
+                        "number": None,
+                        "title": None,
+                        "clauses": []
+                    }
+                    is_in_section = True
+
+                if item["table_data"] is not None:
+                    current_section["clauses"].append({
+                        "text": None,
+                        "label": None,
+                        "index": len(current_section["clauses"]),
+                        "table_data": item["table_data"]
+                    })
+                continue  # Skip to the next item
+
+            # Skip text blocks in the footer or in a table
+            if item["excluded"]:
+                continue
+
+            block_text = item["text"]
+
+            # Cheap first-character prescreen so most prose skips the regexes
+            lead = block_text.lstrip()[:2]
+            first_char = lead[:1]
+            label_match = _LABEL_RE.match(block_text) if first_char in _LABEL_START or first_char.isdecimal() or lead[1:] == '.' else None
+            section_match = clause_match = divider_match = None
+            if label_match:
+                if label_match.group('sec') is not None:
+                    section_match = label_match
+                elif label_match.group('cl') is not None:
+                    clause_match = label_match
+                else:
+                    divider_match = label_match
+
+            # --- State Machine Logic ---
+            if section_match:
+                if current_section:
+                    sections.append(current_section)
+
+                is_in_section = True
+                number = section_match.group('sec').strip()
+                title = clean_text(section_match.group('sec_title'))
+
+                current_section = {
+                    "number": number,
+                    "title": title,
+                    "clauses": []
+                }
+
+            elif not is_in_section and clause_match:
+                if current_section:
+                     sections.append(current_section)
+
+                is_in_section = True
+                label = clean_text(clause_match.group('cl'))
+                title = clean_text(clause_match.group('cl_title')) if clause_match.group('cl_title') else ""
+
+                current_section = {
+                    "number": label,
+                    "title": title,
+                    "clauses": []
+                }
+
+            elif divider_match:
+                if current_section:
+                    sections.append(current_section)
+
+                is_in_section = True
+                title = clean_text(divider_match.group('div'))
+
+                current_section = {
+                    "number": "",
+                    "title": title,
+                    "clauses": []
+                }
+
+            elif is_in_section and current_section and (clause_match or (item["is_bold"] and item["has_capital"])):
+                if clause_match:
+                    label = clean_text(clause_match.group('cl'))
+                    clause_text = clean_text(clause_match.group('cl_title')) if clause_match.group('cl_title') else ""
+                else:
+                    label = clean_text(item["first_span_text"])
+                    label = _QUOTE_STRIP_RE.sub('', label)
+                    clause_text = clean_text(item["first_line_rest"])
+
+                if current_section:
+                    current_section["clauses"].append({
+                        "text": [clause_text],
+                        "label": label,
+                        "index": len(current_section["clauses"])
+                    })
+
+            elif not is_in_section:
+                preamble_parts.append(clean_text(block_text))
+
+            elif is_in_section and current_section:
+                if not current_section["clauses"]:
+                    # This is the start of the first clause, immediately following the section title
+                    current_section["clauses"].append({
+                        "text": [clean_text(block_text)],
+                        "label": "",
+                        "index": 0
+                    })
+                elif "table_data" in current_section["clauses"][-1]:
+                    # Do nothing if the last item was a table
+                    continue
+                else:
+                    # Append to the last clause
+                    last_clause = current_section["clauses"][-1]
+                    last_clause["text"].append(clean_text(block_text))
+
+
+    if current_section:
+        sections.append(current_section)
+
+    # Clause text is collected as a list of fragments while parsing; join them once here
+    for section in sections:
+        for clause in section["clauses"]:
+            if clause["text"] is not None:
+                clause["text"] = " ".join(clause["text"])
+
+    return sections, clean_text(" ".join(preamble_parts))